@@ -1,15 +1,20 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, ASCENDING
 import os
+import io
+import asyncio
+import csv
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone, timedelta, date
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 import razorpay
@@ -77,11 +82,24 @@ class CartItem(BaseModel):
     product_id: str
     quantity: int
 
+class CartProductSnapshot(BaseModel):
+    id: str
+    name: str
+    price: float
+    category: str
+    image_url: str
+    stock: int
+
+class CartLine(BaseModel):
+    product_id: str
+    quantity: int
+    product: CartProductSnapshot  # Denormalized at add-time so cart reads need no product lookups
+
 class Cart(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
-    items: List[CartItem]
+    items: List[CartLine]
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class OrderItem(BaseModel):
@@ -112,6 +130,25 @@ class PaymentVerify(BaseModel):
     razorpay_signature: str
     order_id: str
 
+class OrderFilter(BaseModel):
+    status: Optional[str] = None
+    payment_status: Optional[str] = None
+
+class OrderBulkStatusUpdate(BaseModel):
+    status: str
+    order_ids: Optional[List[str]] = None
+    filter: Optional[OrderFilter] = None
+
+# Allowed admin status changes; delivered and cancelled are final
+ORDER_STATUS_TRANSITIONS = {
+    "pending": {"confirmed", "cancelled"},
+    "confirmed": {"shipped", "cancelled"},
+    "shipped": {"delivered", "cancelled"},
+    "delivered": set(),
+    "cancelled": set()
+}
+BULK_ORDER_LIMIT = 1000
+
 # Helper functions
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -140,6 +177,177 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
 
+# Cart snapshot helpers
+def cart_product_snapshot(product: dict) -> dict:
+    return CartProductSnapshot(**product).model_dump()
+
+async def refresh_cart_snapshots(product_ids: List[str]):
+    # Fan out product changes to every cart holding them, via the items.product_id index
+    products = await db.products.find({"id": {"$in": product_ids}}, {"_id": 0}).to_list(len(product_ids))
+    found = {product['id']: product for product in products}
+    for product_id in product_ids:
+        product = found.get(product_id)
+        if product is None:
+            await db.carts.update_many(
+                {"items.product_id": product_id},
+                {"$pull": {"items": {"product_id": product_id}}}
+            )
+        else:
+            await db.carts.update_many(
+                {"items.product_id": product_id},
+                {"$set": {"items.$[line].product": cart_product_snapshot(product)}},
+                array_filters=[{"line.product_id": product_id}]
+            )
+
+# Sales reporting helpers
+# Confirmed orders are rolled up into daily buckets keyed by the order date (UTC)
+# and taken back out if the order is later cancelled:
+# db.sales_daily_products holds one document per (date, product_id) and
+# db.sales_daily_categories one per (date, category), so reports never scan db.orders.
+SALES_GRANULARITIES = ("day", "week", "month")
+# Serializes live bucket writes against backfill rebuilds (the API runs as a single worker)
+sales_buckets_lock = asyncio.Lock()
+SALES_EXPORT_FIELDS = {
+    "product": ["date", "product_id", "product_name", "category", "units", "revenue", "orders"],
+    "category": ["date", "category", "units", "revenue", "orders"],
+}
+
+def sales_bucket_date(created_at) -> str:
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date().isoformat()
+
+def sales_period(day: str, granularity: str) -> str:
+    if granularity == "month":
+        return day[:7]
+    if granularity == "week":
+        bucket_day = date.fromisoformat(day)
+        return (bucket_day - timedelta(days=bucket_day.weekday())).isoformat()
+    return day
+
+def accumulate_order_sales(order: dict, categories: dict, product_totals: dict, category_totals: dict):
+    day = sales_bucket_date(order['created_at'])
+    counted_categories = set()
+    for item in order.get('items', []):
+        category = categories.get(item['product_id'], "Uncategorized")
+        amount = item['price'] * item['quantity']
+
+        product_bucket = product_totals.setdefault((day, item['product_id']), {
+            "product_name": item['product_name'],
+            "category": category,
+            "units": 0,
+            "revenue": 0,
+            "orders": 0
+        })
+        product_bucket['units'] += item['quantity']
+        product_bucket['revenue'] += amount
+        product_bucket['orders'] += 1
+
+        category_bucket = category_totals.setdefault((day, category), {"units": 0, "revenue": 0, "orders": 0})
+        category_bucket['units'] += item['quantity']
+        category_bucket['revenue'] += amount
+        if category not in counted_categories:
+            category_bucket['orders'] += 1
+            counted_categories.add(category)
+
+async def write_sales_buckets(product_totals: dict, category_totals: dict, product_collection=None, category_collection=None):
+    product_collection = product_collection if product_collection is not None else db.sales_daily_products
+    category_collection = category_collection if category_collection is not None else db.sales_daily_categories
+    product_ops = [
+        UpdateOne(
+            {"date": day, "product_id": product_id},
+            {
+                "$inc": {"units": bucket['units'], "revenue": bucket['revenue'], "orders": bucket['orders']},
+                "$set": {"product_name": bucket['product_name'], "category": bucket['category']}
+            },
+            upsert=True
+        )
+        for (day, product_id), bucket in product_totals.items()
+    ]
+    category_ops = [
+        UpdateOne(
+            {"date": day, "category": category},
+            {"$inc": bucket},
+            upsert=True
+        )
+        for (day, category), bucket in category_totals.items()
+    ]
+    if product_ops:
+        await product_collection.bulk_write(product_ops, ordered=False)
+    if category_ops:
+        await category_collection.bulk_write(category_ops, ordered=False)
+
+async def create_sales_bucket_indexes(product_collection, category_collection):
+    await product_collection.create_index([("date", ASCENDING), ("product_id", ASCENDING)], unique=True)
+    await category_collection.create_index([("date", ASCENDING), ("category", ASCENDING)], unique=True)
+
+async def resolve_sales_categories(order: dict) -> dict:
+    product_ids = [item['product_id'] for item in order.get('items', [])]
+    products = await db.products.find(
+        {"id": {"$in": product_ids}}, {"_id": 0, "id": 1, "category": 1}
+    ).to_list(len(product_ids))
+    found = {product['id']: product['category'] for product in products}
+    return {product_id: found.get(product_id, "Uncategorized") for product_id in product_ids}
+
+async def record_order_sales(order: dict):
+    try:
+        categories = await resolve_sales_categories(order)
+
+        async with sales_buckets_lock:
+            # Claim the order first so a repeated payment verification is only counted once.
+            # The categories are stored so a later reversal hits the same buckets.
+            claimed = await db.orders.update_one(
+                {"id": order['id'], "sales_recorded": {"$ne": True}, "status": {"$ne": "cancelled"}},
+                {"$set": {"sales_recorded": True, "sales_categories": categories}}
+            )
+            if claimed.modified_count == 0:
+                return
+
+            product_totals, category_totals = {}, {}
+            accumulate_order_sales(order, categories, product_totals, category_totals)
+            await write_sales_buckets(product_totals, category_totals)
+    except Exception:
+        # Buckets can be rebuilt with the backfill endpoint; never fail the payment over reporting
+        logger.exception(f"Failed to record sales for order {order['id']}")
+
+async def reverse_orders_sales(order_ids: List[str]):
+    try:
+        async with sales_buckets_lock:
+            # Claim the reversals so a cancelled order is only taken out of the buckets once;
+            # holding the lock keeps another reversal from claiming between the find and the update
+            orders = await db.orders.find(
+                {"id": {"$in": order_ids}, "sales_recorded": True, "sales_reversed": {"$ne": True}},
+                {"_id": 0, "id": 1, "items": 1, "created_at": 1, "sales_categories": 1}
+            ).to_list(len(order_ids))
+            if not orders:
+                return
+            await db.orders.update_many(
+                {"id": {"$in": [order['id'] for order in orders]}},
+                {"$set": {"sales_reversed": True}}
+            )
+
+            # Reverse against the categories each order was originally bucketed under
+            product_totals, category_totals = {}, {}
+            for order in orders:
+                categories = order.get('sales_categories') or await resolve_sales_categories(order)
+                accumulate_order_sales(order, categories, product_totals, category_totals)
+            for totals in (product_totals, category_totals):
+                for bucket in totals.values():
+                    for field in ("units", "revenue", "orders"):
+                        bucket[field] = -bucket[field]
+            await write_sales_buckets(product_totals, category_totals)
+    except Exception:
+        logger.exception(f"Failed to reverse sales for {len(order_ids)} cancelled orders")
+
+def sales_date_range(from_date: Optional[date], to_date: Optional[date]) -> dict:
+    to_date = to_date or datetime.now(timezone.utc).date()
+    from_date = from_date or to_date - timedelta(days=30)
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    return {"$gte": from_date.isoformat(), "$lte": to_date.isoformat()}
+
 # Auth Routes
 @api_router.post("/auth/register")
 async def register(user_data: UserRegister):
@@ -229,7 +437,7 @@ async def create_product(product_data: ProductCreate, current_user: User = Depen
     return product
 
 @api_router.put("/products/{product_id}", response_model=Product)
-async def update_product(product_id: str, product_data: ProductCreate, current_user: User = Depends(get_current_user)):
+async def update_product(product_id: str, product_data: ProductCreate, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -240,13 +448,15 @@ async def update_product(product_id: str, product_data: ProductCreate, current_u
     update_data = product_data.model_dump()
     await db.products.update_one({"id": product_id}, {"$set": update_data})
     
+    background_tasks.add_task(refresh_cart_snapshots, [product_id])
+    
     updated_product = await db.products.find_one({"id": product_id}, {"_id": 0})
     if isinstance(updated_product.get('created_at'), str):
         updated_product['created_at'] = datetime.fromisoformat(updated_product['created_at'])
     return Product(**updated_product)
 
 @api_router.delete("/products/{product_id}")
-async def delete_product(product_id: str, current_user: User = Depends(get_current_user)):
+async def delete_product(product_id: str, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -254,6 +464,9 @@ async def delete_product(product_id: str, current_user: User = Depends(get_curre
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    # Drop the product from any cart that still holds it
+    background_tasks.add_task(refresh_cart_snapshots, [product_id])
+    
     return {"message": "Product deleted successfully"}
 
 @api_router.get("/categories")
@@ -268,83 +481,108 @@ async def get_cart(current_user: User = Depends(get_current_user)):
     if not cart:
         return {"items": []}
     
-    # Fetch product details for each item
-    items_with_details = []
-    for item in cart.get('items', []):
-        product = await db.products.find_one({"id": item['product_id']}, {"_id": 0})
-        if product:
-            items_with_details.append({
-                "product": product,
-                "quantity": item['quantity']
-            })
+    items = cart.get('items', [])
+    
+    # Carts written before snapshots existed are filled in once and saved back
+    missing_ids = [item['product_id'] for item in items if 'product' not in item]
+    if missing_ids:
+        products = await db.products.find({"id": {"$in": missing_ids}}, {"_id": 0}).to_list(len(missing_ids))
+        found = {product['id']: product for product in products}
+        items = [
+            {**item, "product": cart_product_snapshot(found[item['product_id']])} if 'product' not in item else item
+            for item in items
+            if 'product' in item or item['product_id'] in found
+        ]
+        
+        # Touch only the lines still missing a snapshot so concurrent cart writes are kept
+        snapshots = {product_id: cart_product_snapshot(product) for product_id, product in found.items()}
+        if snapshots:
+            await db.carts.update_one(
+                {"user_id": current_user.id},
+                {"$set": {f"items.$[line{index}].product": snapshot for index, snapshot in enumerate(snapshots.values())}},
+                array_filters=[
+                    {f"line{index}.product_id": product_id, f"line{index}.product": {"$exists": False}}
+                    for index, product_id in enumerate(snapshots)
+                ]
+            )
+        deleted_ids = [product_id for product_id in missing_ids if product_id not in found]
+        if deleted_ids:
+            await db.carts.update_one(
+                {"user_id": current_user.id},
+                {"$pull": {"items": {"product_id": {"$in": deleted_ids}, "product": {"$exists": False}}}}
+            )
     
-    return {"items": items_with_details}
+    return {"items": [{"product": item['product'], "quantity": item['quantity']} for item in items]}
 
 @api_router.post("/cart/add")
 async def add_to_cart(item: CartItem, current_user: User = Depends(get_current_user)):
     # Verify product exists
-    product = await db.products.find_one({"id": item.product_id})
+    product = await db.products.find_one({"id": item.product_id}, {"_id": 0})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    snapshot = cart_product_snapshot(product)
     
-    # Get or create cart
-    cart = await db.carts.find_one({"user_id": current_user.id})
-    
-    if not cart:
-        cart = Cart(
-            user_id=current_user.id,
-            items=[item.model_dump()]
-        )
-        cart_dict = cart.model_dump()
-        cart_dict['updated_at'] = cart_dict['updated_at'].isoformat()
-        await db.carts.insert_one(cart_dict)
-    else:
-        # Update existing cart
-        items = cart.get('items', [])
-        item_exists = False
-        
-        for cart_item in items:
-            if cart_item['product_id'] == item.product_id:
-                cart_item['quantity'] += item.quantity
-                item_exists = True
-                break
-        
-        if not item_exists:
-            items.append(item.model_dump())
-        
-        await db.carts.update_one(
-            {"user_id": current_user.id},
-            {"$set": {"items": items, "updated_at": datetime.now(timezone.utc).isoformat()}}
+    # Lines are changed in place rather than rewriting items, so a concurrent
+    # snapshot refresh on another line is never undone
+    async def increment_existing_line():
+        result = await db.carts.update_one(
+            {"user_id": current_user.id, "items.product_id": item.product_id},
+            {
+                "$inc": {"items.$.quantity": item.quantity},
+                "$set": {"items.$.product": snapshot, "updated_at": datetime.now(timezone.utc).isoformat()}
+            }
         )
+        return result.matched_count > 0
+    
+    if not await increment_existing_line():
+        cart = await db.carts.find_one({"user_id": current_user.id}, {"_id": 1})
+        if not cart:
+            cart = Cart(
+                user_id=current_user.id,
+                items=[CartLine(**item.model_dump(), product=snapshot)]
+            )
+            cart_dict = cart.model_dump()
+            cart_dict['updated_at'] = cart_dict['updated_at'].isoformat()
+            await db.carts.insert_one(cart_dict)
+        else:
+            pushed = await db.carts.update_one(
+                {"user_id": current_user.id, "items.product_id": {"$ne": item.product_id}},
+                {
+                    "$push": {"items": {**item.model_dump(), "product": snapshot}},
+                    "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
+                }
+            )
+            if pushed.matched_count == 0:
+                # The line was added concurrently; add to it instead
+                await increment_existing_line()
+    
+    # A product update may have refreshed carts between our read and write; re-apply it if so
+    current_product = await db.products.find_one({"id": item.product_id}, {"_id": 0})
+    if current_product is None or cart_product_snapshot(current_product) != snapshot:
+        await refresh_cart_snapshots([item.product_id])
     
     return {"message": "Item added to cart"}
 
 @api_router.put("/cart/update")
 async def update_cart_item(item: CartItem, current_user: User = Depends(get_current_user)):
-    cart = await db.carts.find_one({"user_id": current_user.id})
-    if not cart:
-        raise HTTPException(status_code=404, detail="Cart not found")
-    
-    items = cart.get('items', [])
-    found = False
-    
-    for cart_item in items:
-        if cart_item['product_id'] == item.product_id:
-            if item.quantity <= 0:
-                items.remove(cart_item)
-            else:
-                cart_item['quantity'] = item.quantity
-            found = True
-            break
-    
-    if not found:
-        raise HTTPException(status_code=404, detail="Item not in cart")
+    # Change only the targeted line so a concurrent snapshot refresh is never undone
+    updated_at = datetime.now(timezone.utc).isoformat()
+    if item.quantity <= 0:
+        update = {"$pull": {"items": {"product_id": item.product_id}}, "$set": {"updated_at": updated_at}}
+    else:
+        update = {"$set": {"items.$.quantity": item.quantity, "updated_at": updated_at}}
     
-    await db.carts.update_one(
-        {"user_id": current_user.id},
-        {"$set": {"items": items, "updated_at": datetime.now(timezone.utc).isoformat()}}
+    result = await db.carts.update_one(
+        {"user_id": current_user.id, "items.product_id": item.product_id},
+        update
     )
     
+    if result.matched_count == 0:
+        cart = await db.carts.find_one({"user_id": current_user.id}, {"_id": 1})
+        if not cart:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        raise HTTPException(status_code=404, detail="Item not in cart")
+    
     return {"message": "Cart updated"}
 
 @api_router.delete("/cart/clear")
@@ -408,7 +646,7 @@ async def create_order(order_data: OrderCreate, current_user: User = Depends(get
     }
 
 @api_router.post("/orders/verify-payment")
-async def verify_payment(payment_data: PaymentVerify, current_user: User = Depends(get_current_user)):
+async def verify_payment(payment_data: PaymentVerify, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
     try:
         # Verify signature
         razorpay_client.utility.verify_payment_signature({
@@ -434,10 +672,14 @@ async def verify_payment(payment_data: PaymentVerify, current_user: User = Depen
                 {"id": item['product_id']},
                 {"$inc": {"stock": -item['quantity']}}
             )
+        background_tasks.add_task(refresh_cart_snapshots, [item['product_id'] for item in order['items']])
         
         # Clear cart
         await db.carts.delete_one({"user_id": current_user.id})
-        
+
+        # Roll the order into the daily sales buckets; this waits while a backfill runs
+        background_tasks.add_task(record_order_sales, order)
+
         return {"message": "Payment verified successfully", "order_id": payment_data.order_id}
     except Exception as e:
         await db.orders.update_one(
@@ -476,16 +718,106 @@ async def update_order_status(order_id: str, status: str, current_user: User = D
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    if status not in ORDER_STATUS_TRANSITIONS:
+        raise HTTPException(status_code=400, detail="Invalid order status")
+    
+    order = await db.orders.find_one({"id": order_id}, {"_id": 0, "status": 1})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    current_status = order.get('status', 'pending')
+    if status not in ORDER_STATUS_TRANSITIONS.get(current_status, set()):
+        raise HTTPException(status_code=400, detail=f"Cannot change order status from {current_status} to {status}")
+    
+    # Matching on the current status keeps a concurrent change from being overwritten
     result = await db.orders.update_one(
-        {"id": order_id},
+        {"id": order_id, "status": current_status},
         {"$set": {"status": status}}
     )
     
     if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(status_code=409, detail="Order status changed, please retry")
+    
+    if status == "cancelled":
+        await reverse_orders_sales([order_id])
     
     return {"message": "Order status updated"}
 
+@api_router.post("/admin/orders/bulk-status")
+async def bulk_update_order_status(update: OrderBulkStatusUpdate, current_user: User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if update.status not in ORDER_STATUS_TRANSITIONS:
+        raise HTTPException(status_code=400, detail="Invalid order status")
+    if (update.order_ids is None) == (update.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either order_ids or filter")
+    
+    if update.order_ids is not None:
+        if len(update.order_ids) > BULK_ORDER_LIMIT:
+            raise HTTPException(status_code=400, detail=f"At most {BULK_ORDER_LIMIT} orders per request")
+        query = {"id": {"$in": update.order_ids}}
+    else:
+        query = update.filter.model_dump(exclude_none=True)
+        if not query:
+            raise HTTPException(status_code=400, detail="Filter must not be empty")
+        # Only page through orders that can actually move to the target status
+        eligible = [current for current, allowed in ORDER_STATUS_TRANSITIONS.items() if update.status in allowed]
+        if "status" in query:
+            eligible = [current for current in eligible if current == query['status']]
+        query['status'] = {"$in": eligible}
+    
+    # Oldest orders first; fetch one extra to tell the caller whether more matched
+    orders = await db.orders.find(query, {"_id": 0, "id": 1, "status": 1}).sort("created_at", ASCENDING).to_list(BULK_ORDER_LIMIT + 1)
+    has_more = len(orders) > BULK_ORDER_LIMIT
+    orders = orders[:BULK_ORDER_LIMIT]
+    
+    # Validate every transition up front and batch the valid ones
+    results = {}
+    operations = []
+    for order in orders:
+        current_status = order.get('status', 'pending')
+        if update.status in ORDER_STATUS_TRANSITIONS.get(current_status, set()):
+            # Matching on the current status keeps a concurrent change from being overwritten
+            operations.append(UpdateOne(
+                {"id": order['id'], "status": current_status},
+                {"$set": {"status": update.status}}
+            ))
+            result = "updated"
+        else:
+            result = "invalid_transition"
+        results[order['id']] = {"order_id": order['id'], "previous_status": current_status, "result": result}
+    
+    if update.order_ids is not None:
+        for order_id in update.order_ids:
+            results.setdefault(order_id, {"order_id": order_id, "previous_status": None, "result": "not_found"})
+    
+    if operations:
+        write_result = await db.orders.bulk_write(operations, ordered=False)
+        if write_result.matched_count < len(operations):
+            # Some orders changed status in the meantime; report which ones were skipped
+            updated_ids = [order_id for order_id, item in results.items() if item['result'] == "updated"]
+            current = await db.orders.find(
+                {"id": {"$in": updated_ids}}, {"_id": 0, "id": 1, "status": 1}
+            ).to_list(len(updated_ids))
+            for order in current:
+                if order.get('status') != update.status:
+                    results[order['id']]['result'] = "conflict"
+    
+    if update.status == "cancelled":
+        cancelled_ids = [item['order_id'] for item in results.values() if item['result'] == "updated"]
+        if cancelled_ids:
+            await reverse_orders_sales(cancelled_ids)
+    
+    results = list(results.values())
+    return {
+        "status": update.status,
+        "matched": len(orders),
+        "updated": sum(1 for item in results if item['result'] == "updated"),
+        "has_more": has_more,
+        "results": results
+    }
+
 # Admin Routes
 @api_router.get("/admin/analytics")
 async def get_analytics(current_user: User = Depends(get_current_user)):
@@ -522,6 +854,151 @@ async def get_analytics(current_user: User = Depends(get_current_user)):
         "category_sales": category_sales
     }
 
+@api_router.get("/admin/reports/sales")
+async def get_sales_report(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    granularity: str = "day",
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if granularity not in SALES_GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(SALES_GRANULARITIES)}")
+
+    query = {"date": sales_date_range(from_date, to_date)}
+
+    # Time series and category totals come from the category buckets
+    category_buckets = await db.sales_daily_categories.find(query, {"_id": 0}).sort("date", 1).to_list(None)
+    series = {}
+    category_sales = {}
+    for bucket in category_buckets:
+        period = sales_period(bucket['date'], granularity)
+        point = series.setdefault(period, {"period": period, "units": 0, "revenue": 0, "categories": {}})
+        point['units'] += bucket['units']
+        point['revenue'] += bucket['revenue']
+        point['categories'][bucket['category']] = point['categories'].get(bucket['category'], 0) + bucket['revenue']
+
+        totals = category_sales.setdefault(bucket['category'], {"units": 0, "revenue": 0, "orders": 0})
+        totals['units'] += bucket['units']
+        totals['revenue'] += bucket['revenue']
+        totals['orders'] += bucket['orders']
+
+    # Per-product totals are grouped server-side over the product buckets
+    product_sales = await db.sales_daily_products.aggregate([
+        {"$match": query},
+        {"$sort": {"date": 1}},
+        {"$group": {
+            "_id": "$product_id",
+            "product_name": {"$last": "$product_name"},
+            "category": {"$last": "$category"},
+            "units": {"$sum": "$units"},
+            "revenue": {"$sum": "$revenue"},
+            "orders": {"$sum": "$orders"}
+        }},
+        {"$sort": {"revenue": -1}},
+        {"$project": {"_id": 0, "product_id": "$_id", "product_name": 1, "category": 1, "units": 1, "revenue": 1, "orders": 1}}
+    ]).to_list(None)
+
+    return {
+        "from": query['date']['$gte'],
+        "to": query['date']['$lte'],
+        "granularity": granularity,
+        "total_revenue": sum(point['revenue'] for point in series.values()),
+        "total_units": sum(point['units'] for point in series.values()),
+        "series": list(series.values()),
+        "category_sales": category_sales,
+        "product_sales": product_sales
+    }
+
+@api_router.get("/admin/reports/sales/export")
+async def export_sales_report(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    level: str = "product",
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if level not in SALES_EXPORT_FIELDS:
+        raise HTTPException(status_code=400, detail="level must be 'product' or 'category'")
+
+    query = {"date": sales_date_range(from_date, to_date)}
+    fields = SALES_EXPORT_FIELDS[level]
+    collection = db.sales_daily_products if level == "product" else db.sales_daily_categories
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    filename = f"sales_{level}_{query['date']['$gte']}_{query['date']['$lte']}.csv"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    async def stream_csv():
+        # Flush every 1000 buckets straight off the cursor
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        rows = 0
+        async for bucket in collection.find(query, projection).sort("date", 1):
+            writer.writerow(bucket)
+            rows += 1
+            if rows % 1000 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    return StreamingResponse(stream_csv(), media_type="text/csv", headers=headers)
+
+@api_router.post("/admin/reports/sales/backfill")
+async def backfill_sales_report(current_user: User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    # Live recording and reversal wait on the lock, so nothing lands in the buckets being replaced
+    async with sales_buckets_lock:
+        products = await db.products.find({}, {"_id": 0, "id": 1, "category": 1}).to_list(None)
+        categories = {product['id']: product['category'] for product in products}
+        
+        # Rebuild every bucket from the completed order history into staging collections
+        product_staging = db.sales_daily_products_staging
+        category_staging = db.sales_daily_categories_staging
+        await product_staging.drop()
+        await category_staging.drop()
+        await create_sales_bucket_indexes(product_staging, category_staging)
+        
+        product_totals, category_totals = {}, {}
+        order_marks = []
+        async for order in db.orders.find(
+            {"payment_status": "completed", "status": {"$ne": "cancelled"}},
+            {"_id": 0, "id": 1, "items": 1, "created_at": 1}
+        ):
+            accumulate_order_sales(order, categories, product_totals, category_totals)
+            # Store the categories used so a later reversal hits the same buckets
+            order_marks.append(UpdateOne(
+                {"id": order['id']},
+                {"$set": {
+                    "sales_recorded": True,
+                    "sales_categories": {
+                        item['product_id']: categories.get(item['product_id'], "Uncategorized")
+                        for item in order.get('items', [])
+                    }
+                }}
+            ))
+        
+        await write_sales_buckets(product_totals, category_totals, product_staging, category_staging)
+        for start in range(0, len(order_marks), BULK_ORDER_LIMIT):
+            await db.orders.bulk_write(order_marks[start:start + BULK_ORDER_LIMIT], ordered=False)
+        
+        # Swap the staged buckets in; each rename replaces its target in one step
+        await product_staging.rename("sales_daily_products", dropTarget=True)
+        await category_staging.rename("sales_daily_categories", dropTarget=True)
+    
+    return {
+        "message": "Sales report backfilled",
+        "orders": len(order_marks),
+        "product_buckets": len(product_totals),
+        "category_buckets": len(category_totals)
+    }
+
 # Include the router
 app.include_router(api_router)
 
@@ -545,6 +1022,20 @@ async def shutdown_db_client():
 
 @app.on_event("startup")
 async def startup_db():
+    # Indexes for single-read carts and product change fan-out
+    await db.carts.create_index("user_id")
+    await db.carts.create_index("items.product_id")
+    
+    # Order lookups by id, used by status updates and sales claims
+    await db.orders.create_index("id", unique=True)
+    
+    # Indexes for filtered admin order batches
+    await db.orders.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+    await db.orders.create_index([("payment_status", ASCENDING), ("created_at", ASCENDING)])
+    
+    # Indexes for the daily sales buckets
+    await create_sales_bucket_indexes(db.sales_daily_products, db.sales_daily_categories)
+
     # Create admin user if not exists
     admin_exists = await db.users.find_one({"email": "admin@luxejewel.com"})
     if not admin_exists:
@@ -8,6 +8,23 @@ import { Button } from '../../components/ui/button';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '../../components/ui/select';
 import { toast } from 'sonner';
 
+const STATUS_LABELS = {
+  pending: 'Pending',
+  confirmed: 'Confirmed',
+  shipped: 'Shipped',
+  delivered: 'Delivered',
+  cancelled: 'Cancelled',
+};
+
+// Mirrors ORDER_STATUS_TRANSITIONS in the backend; delivered and cancelled are final
+const STATUS_TRANSITIONS = {
+  pending: ['confirmed', 'cancelled'],
+  confirmed: ['shipped', 'cancelled'],
+  shipped: ['delivered', 'cancelled'],
+  delivered: [],
+  cancelled: [],
+};
+
 export default function AdminOrders() {
   const { user } = useAuth();
   const navigate = useNavigate();
@@ -41,7 +58,7 @@ export default function AdminOrders() {
       fetchOrders();
     } catch (error) {
       console.error('Failed to update order status:', error);
-      toast.error('Failed to update order status');
+      toast.error(error.response?.data?.detail || 'Failed to update order status');
     }
   };
 
@@ -140,6 +157,7 @@ export default function AdminOrders() {
                         <Select
                           value={order.status}
                           onValueChange={(value) => handleStatusChange(order.id, value)}
+                          disabled={(STATUS_TRANSITIONS[order.status] || []).length === 0}
                         >
                           <SelectTrigger
                             className={getStatusColor(order.status)}
@@ -149,11 +167,11 @@ export default function AdminOrders() {
                             <SelectValue />
                           </SelectTrigger>
                           <SelectContent>
-                            <SelectItem value="pending">Pending</SelectItem>
-                            <SelectItem value="confirmed">Confirmed</SelectItem>
-                            <SelectItem value="shipped">Shipped</SelectItem>
-                            <SelectItem value="delivered">Delivered</SelectItem>
-                            <SelectItem value="cancelled">Cancelled</SelectItem>
+                            {[order.status, ...(STATUS_TRANSITIONS[order.status] || [])].map((status) => (
+                              <SelectItem key={status} value={status} disabled={status === order.status}>
+                                {STATUS_LABELS[status] || status}
+                              </SelectItem>
+                            ))}
                           </SelectContent>
                         </Select>
                       </div>